@@ -1,11 +1,27 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
+import threading
+from collections import abc
+from dataclasses import dataclass, field
+from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Union
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 from uuid import uuid4
 
+import orjson
 from pycrdt import Array, Doc, Map
 from pydantic import BaseModel
 from ypywidgets.comm import CommWidget
@@ -28,7 +44,48 @@ from .objects import (
 )
 from .utils import get_source_layer_names, normalize_path
 
-logger = logging.getLogger(__file__)
+logger = logging.getLogger(__name__)
+
+
+def _check_opacity(opacity: float) -> None:
+    if not 0 <= opacity <= 1:
+        raise ValueError(f"Opacity should be between 0 and 1, got {opacity}")
+
+
+def _check_zoom_range(min_zoom: float, max_zoom: float) -> None:
+    if not 0 <= min_zoom <= max_zoom <= 24:
+        raise ValueError(
+            "Zoom levels should satisfy 0 <= min_zoom <= max_zoom <= 24, "
+            f"got min_zoom={min_zoom} and max_zoom={max_zoom}"
+        )
+
+
+class _YMapView(abc.Mapping):
+    """
+    Read-only mapping over a pycrdt Map, values are only converted to Python
+    objects when accessed
+    """
+
+    def __init__(self, ymap: Map):
+        self._ymap = ymap
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._ymap[key]
+        if isinstance(value, (Map, Array)):
+            return value.to_py()
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ymap)
+
+    def __len__(self) -> int:
+        return len(self._ymap)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._ymap
+
+    def __repr__(self) -> str:
+        return repr(self._ymap.to_py())
 
 
 def reversed_tree(root):
@@ -70,28 +127,33 @@ class GISDocument(CommWidget):
         self.ydoc["options"] = self._options = Map()
         self.ydoc["layerTree"] = self._layerTree = Array()
 
+        # Content hash of the sources added from Python, to reuse identical ones
+        self._source_hash_to_id: Dict[str, str] = {}
+
         if path is None:
-            if latitude is not None:
-                self._options["latitude"] = latitude
-            if longitude is not None:
-                self._options["longitude"] = longitude
-            if extent is not None:
-                self._options["extent"] = extent
-            if zoom is not None:
-                self._options["zoom"] = zoom
-            if bearing is not None:
-                self._options["bearing"] = bearing
-            if pitch is not None:
-                self._options["pitch"] = pitch
-            if projection is not None:
-                self._options["projection"] = projection
+            # Set all the options at once, this sends a single update
+            with self.ydoc.transaction():
+                if latitude is not None:
+                    self._options["latitude"] = latitude
+                if longitude is not None:
+                    self._options["longitude"] = longitude
+                if extent is not None:
+                    self._options["extent"] = extent
+                if zoom is not None:
+                    self._options["zoom"] = zoom
+                if bearing is not None:
+                    self._options["bearing"] = bearing
+                if pitch is not None:
+                    self._options["pitch"] = pitch
+                if projection is not None:
+                    self._options["projection"] = projection
 
     @property
-    def layers(self) -> Dict:
+    def layers(self) -> Mapping[str, Dict]:
         """
-        Get the layer list
+        Get the layer list, as a read-only view on the document layers
         """
-        return self._layers.to_py()
+        return _YMapView(self._layers)
 
     @property
     def layer_tree(self) -> List[str | Dict]:
@@ -127,6 +189,8 @@ class GISDocument(CommWidget):
         :param attribution: The attribution.
         :param opacity: The opacity, between 0 and 1.
         """
+        _check_opacity(opacity)
+
         source = {
             "type": SourceType.RasterSource,
             "name": f"{name} Source",
@@ -178,6 +242,9 @@ class GISDocument(CommWidget):
         :param attribution: The attribution.
         :param opacity: The opacity, between 0 and 1.
         """
+        _check_opacity(opacity)
+        _check_zoom_range(min_zoom, max_zoom)
+
         source_layers = get_source_layer_names(url)
         if source_layer is None and len(source_layers) == 1:
             source_layer = source_layers[0]
@@ -213,12 +280,7 @@ class GISDocument(CommWidget):
                 "color": color_expr,
                 "opacity": opacity,
             },
-            "filters": {
-                "appliedFilters": [
-                    {"feature": feature, "operator": operator, "value": value}
-                ],
-                "logicalOp": logical_op,
-            },
+            "filters": self._build_filters(logical_op, feature, operator, value),
         }
 
         return self._add_layer(OBJECT_FACTORY.create_layer(layer, self))
@@ -235,6 +297,7 @@ class GISDocument(CommWidget):
         operator: str | None = None,
         value: Union[str, number, float] | None = None,
         color_expr=None,
+        embed: bool = True,
     ):
         """
         Add a GeoJSON Layer to the document.
@@ -246,6 +309,9 @@ class GISDocument(CommWidget):
         :param color: The color to apply to features.
         :param opacity: The opacity, between 0 and 1.
         :param color_expr: The style expression used to style the layer, defaults to None
+        :param embed: Whether to embed the file content into the jGIS file, defaults to True.
+            If False, the path is stored as is and must be relative to the jGIS file,
+            absolute paths are rejected.
         """
         if path is None and data is None:
             raise ValueError("Cannot create a GeoJSON layer without data")
@@ -253,13 +319,30 @@ class GISDocument(CommWidget):
         if path is not None and data is not None:
             raise ValueError("Cannot set GeoJSON layer data and path at the same time")
 
+        _check_opacity(opacity)
+
         if path is not None:
-            # We cannot put the path to the file in the model
-            # We don't know where the kernel runs/live
-            # The front-end would have no way of finding the file reliably
-            # TODO Support urls to JSON files, in that case, don't embed the data
-            with open(path, "r") as fobj:
-                parameters = {"data": json.loads(fobj.read())}
+            if embed:
+                # We cannot put the path to the file in the model
+                # We don't know where the kernel runs/live
+                # The front-end would have no way of finding the file reliably
+                # Parse the raw bytes, this avoids holding a decoded copy of
+                # the whole file in memory
+                content = Path(path).read_bytes()
+                try:
+                    data = orjson.loads(content)
+                except orjson.JSONDecodeError:
+                    # Some exporters write NaN/Infinity, which orjson rejects
+                    data = json.loads(content)
+                parameters = {"data": data}
+            else:
+                # The front-end resolves the path relatively to the jGIS file
+                if Path(path).is_absolute():
+                    raise ValueError(
+                        "Cannot reference a GeoJSON file by absolute path, "
+                        "use a path relative to the jGIS file or embed it"
+                    )
+                parameters = {"path": path}
 
         if data is not None:
             parameters = {"data": data}
@@ -282,12 +365,7 @@ class GISDocument(CommWidget):
                 "color": color_expr,
                 "opacity": opacity,
             },
-            "filters": {
-                "appliedFilters": [
-                    {"feature": feature, "operator": operator, "value": value}
-                ],
-                "logicalOp": logical_op,
-            },
+            "filters": self._build_filters(logical_op, feature, operator, value),
         }
 
         return self._add_layer(OBJECT_FACTORY.create_layer(layer, self))
@@ -311,6 +389,8 @@ class GISDocument(CommWidget):
         if url is None or coordinates is None:
             raise ValueError("URL and Coordinates are required")
 
+        _check_opacity(opacity)
+
         source = {
             "type": SourceType.ImageSource,
             "name": f"{name} Source",
@@ -347,6 +427,8 @@ class GISDocument(CommWidget):
         if urls is None or coordinates is None:
             raise ValueError("URLs and Coordinates are required")
 
+        _check_opacity(opacity)
+
         source = {
             "type": SourceType.VideoSource,
             "name": f"{name} Source",
@@ -388,6 +470,7 @@ class GISDocument(CommWidget):
         :param float opacity: The opacity, between 0 and 1, defaults to 1.0
         :param _type_ color_expr: The style expression used to style the layer, defaults to None
         """
+        _check_opacity(opacity)
 
         source = {
             "type": SourceType.GeoTiffSource,
@@ -490,19 +573,14 @@ class GISDocument(CommWidget):
             raise ValueError(f"No layer found with ID: {layer_id}")
 
         # Initialize filters if it doesn't exist
-        if "filters" not in layer:
-            layer["filters"] = {
-                "appliedFilters": [
-                    {"feature": feature, "operator": operator, "value": value}
-                ],
-                "logicalOp": logical_op,
-            }
+        filters = layer.get("filters")
+        if filters is None:
+            layer["filters"] = self._build_filters(logical_op, feature, operator, value)
 
             self._layers[layer_id] = layer
             return
 
         # Add new filter
-        filters = layer["filters"]
         filters["appliedFilters"].append(
             {"feature": feature, "operator": operator, "value": value}
         )
@@ -535,25 +613,29 @@ class GISDocument(CommWidget):
         if layer is None:
             raise ValueError(f"No layer found with ID: {layer_id}")
 
-        if "filters" not in layer:
+        filters = layer.get("filters")
+        if filters is None:
             raise ValueError(f"No filters applied to layer: {layer_id}")
 
         # Find the feature within the layer
-        feature = next(
-            (f for f in layer["filters"]["appliedFilters"] if f["feature"] == feature),
+        applied_filter = next(
+            (f for f in filters["appliedFilters"] if f["feature"] == feature),
             None,
         )
-        if feature is None:
+        if applied_filter is None:
             raise ValueError(
                 f"No feature found with ID: {feature} in layer: {layer_id}"
             )
+
+        # Nothing to update, don't send an update for the whole layer
+        if applied_filter["value"] == value and filters["logicalOp"] == logical_op:
             return
 
         # Update the feature value
-        feature["value"] = value
+        applied_filter["value"] = value
 
         # update the logical operation
-        layer["filters"]["logicalOp"] = logical_op
+        filters["logicalOp"] = logical_op
 
         self._layers[layer_id] = layer
 
@@ -569,23 +651,73 @@ class GISDocument(CommWidget):
         if layer is None:
             raise ValueError(f"No layer found with ID: {layer_id}")
 
-        if "filters" not in layer:
+        filters = layer.get("filters")
+        if filters is None:
             raise ValueError(f"No filters applied to layer: {layer_id}")
 
-        layer["filters"]["appliedFilters"] = []
+        # Nothing to clear, don't send an update for the whole layer
+        if not filters["appliedFilters"]:
+            return
+
+        filters["appliedFilters"] = []
         self._layers[layer_id] = layer
 
-    def _add_source(self, new_object: "JGISObject"):
+    @staticmethod
+    def _build_filters(
+        logical_op: str | None,
+        feature: str | None,
+        operator: str | None,
+        value: Union[str, int, float] | None,
+    ) -> Dict | None:
+        if feature is None:
+            return None
+
+        return {
+            "appliedFilters": [
+                {"feature": feature, "operator": operator, "value": value}
+            ],
+            "logicalOp": logical_op,
+        }
+
+    def _add_source(self, new_object: JGISSource):
+        obj_dict = new_object.to_dict()
+
+        # Sources embedding their data (GeoJSON) are not shared, hashing and
+        # comparing the whole payload would cost more than the duplicate
+        if obj_dict["parameters"].get("data") is not None:
+            _id = str(uuid4())
+            self._sources[_id] = obj_dict
+            return _id
+
+        # Sources with the same type and parameters are shared between layers,
+        # the name is not part of the hash so that it can be reused
+        content = {"type": obj_dict["type"], "parameters": obj_dict["parameters"]}
+        source_hash = hashlib.blake2b(
+            orjson.dumps(content, option=orjson.OPT_SORT_KEYS), digest_size=16
+        ).hexdigest()
+
+        _id = self._source_hash_to_id.get(source_hash)
+        # The source may have been edited or removed since it was added
+        if _id is not None:
+            existing = self._sources.get(_id)
+            if (
+                existing is not None
+                and existing["type"] == content["type"]
+                and existing["parameters"] == content["parameters"]
+            ):
+                return _id
+
         _id = str(uuid4())
-        obj_dict = json.loads(new_object.json())
         self._sources[_id] = obj_dict
+        self._source_hash_to_id[source_hash] = _id
         return _id
 
-    def _add_layer(self, new_object: "JGISObject"):
+    def _add_layer(self, new_object: JGISLayer):
         _id = str(uuid4())
-        obj_dict = json.loads(new_object.json())
-        self._layers[_id] = obj_dict
-        self._layerTree.append(_id)
+        obj_dict = new_object.to_dict()
+        with self.ydoc.transaction():
+            self._layers[_id] = obj_dict
+            self._layerTree.append(_id)
         return _id
 
     @classmethod
@@ -596,10 +728,8 @@ class GISDocument(CommWidget):
 
         if filePath is not None:
             path = normalize_path(filePath)
-            file_name = Path(path).name
-            try:
-                ext = file_name.split(".")[1].lower()
-            except Exception:
+            ext = Path(path).suffix[1:].lower()
+            if not ext:
                 raise ValueError("Can not detect file extension!")
             if ext == "jgis":
                 format = "text"
@@ -617,11 +747,12 @@ class GISDocument(CommWidget):
         )
 
 
-class JGISLayer(BaseModel):
-    class Config:
-        arbitrary_types_allowed = True
-        extra = "allow"
+def _enum_value(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
 
+@dataclass
+class JGISLayer:
     name: str
     type: LayerType
     visible: bool
@@ -633,18 +764,27 @@ class JGISLayer(BaseModel):
         IImageLayer,
         IWebGlLayer,
     ]
-    _parent = Optional[GISDocument]
-
-    def __init__(__pydantic_self__, parent, **data: Any) -> None:  # noqa
-        super().__init__(**data)
-        __pydantic_self__._parent = parent
+    filters: Optional[Dict] = None
+    _parent: Optional[GISDocument] = field(default=None, repr=False, compare=False)
 
+    def to_dict(self) -> Dict:
+        """
+        Get the layer as a JSON-compatible dict, ready to be stored in the document
+        """
+        layer = {
+            "name": self.name,
+            "type": _enum_value(self.type),
+            "visible": self.visible,
+            "parameters": self.parameters.model_dump(mode="json"),
+        }
+        # Filters are optional, don't store an empty entry
+        if self.filters:
+            layer["filters"] = self.filters
+        return layer
 
-class JGISSource(BaseModel):
-    class Config:
-        arbitrary_types_allowed = True
-        extra = "allow"
 
+@dataclass
+class JGISSource:
     name: str
     type: SourceType
     parameters: Union[
@@ -655,75 +795,66 @@ class JGISSource(BaseModel):
         IVideoSource,
         IGeoTiffSource,
     ]
-    _parent = Optional[GISDocument]
-
-    def __init__(__pydantic_self__, parent, **data: Any) -> None:  # noqa
-        super().__init__(**data)
-        __pydantic_self__._parent = parent
-
-
-class SingletonMeta(type):
-    _instances = {}
+    _parent: Optional[GISDocument] = field(default=None, repr=False, compare=False)
 
-    def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            instance = super().__call__(*args, **kwargs)
-            cls._instances[cls] = instance
-        return cls._instances[cls]
+    def to_dict(self) -> Dict:
+        """
+        Get the source as a JSON-compatible dict, ready to be stored in the document
+        """
+        return {
+            "name": self.name,
+            "type": _enum_value(self.type),
+            "parameters": self.parameters.model_dump(mode="json"),
+        }
 
 
-class ObjectFactoryManager(metaclass=SingletonMeta):
+class ObjectFactoryManager:
     def __init__(self):
-        self._factories: Dict[str, type[BaseModel]] = {}
+        self._factories: Dict[str, Tuple[type[BaseModel], Tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
 
     def register_factory(self, shape_type: str, cls: type[BaseModel]) -> None:
-        if shape_type not in self._factories:
-            self._factories[shape_type] = cls
+        with self._lock:
+            if shape_type not in self._factories:
+                self._factories[shape_type] = (cls, tuple(cls.model_fields))
 
     def create_layer(
         self, data: Dict, parent: Optional[GISDocument] = None
     ) -> Optional[JGISLayer]:
-        object_type = data.get("type", None)
-        name: str = data.get("name", None)
-        visible: str = data.get("visible", True)
-        filters = data.get("filters", None)
-        if object_type and object_type in self._factories:
-            Model = self._factories[object_type]
-            args = {}
-            params = data["parameters"]
-            for field in Model.__fields__:
-                args[field] = params.get(field, None)
-            obj_params = Model(**args)
-            return JGISLayer(
-                parent=parent,
-                name=name,
-                visible=visible,
-                type=object_type,
-                parameters=obj_params,
-                filters=filters,
-            )
-
-        return None
+        object_type = data.get("type")
+        try:
+            Model, fields = self._factories[object_type]
+        except KeyError:
+            return None
+
+        params = data["parameters"]
+        obj_params = Model(**{field: params.get(field) for field in fields})
+        return JGISLayer(
+            name=data["name"],
+            visible=data.get("visible", True),
+            type=object_type,
+            parameters=obj_params,
+            filters=data.get("filters"),
+            _parent=parent,
+        )
 
     def create_source(
         self, data: Dict, parent: Optional[GISDocument] = None
     ) -> Optional[JGISSource]:
-        object_type = data.get("type", None)
-        name: str = data.get("name", None)
-        if object_type and object_type in self._factories:
-            Model = self._factories[object_type]
-            args = {}
-            params = data["parameters"]
-            for field in Model.__fields__:
-                args[field] = params.get(field, None)
-            obj_params = Model(**args)
-            return JGISSource(
-                parent=parent, name=name, type=object_type, parameters=obj_params
-            )
-
-        return None
+        object_type = data.get("type")
+        try:
+            Model, fields = self._factories[object_type]
+        except KeyError:
+            return None
+
+        params = data["parameters"]
+        obj_params = Model(**{field: params.get(field) for field in fields})
+        return JGISSource(
+            name=data["name"], type=object_type, parameters=obj_params, _parent=parent
+        )
 
 
+# Shared factory, created once at import time
 OBJECT_FACTORY = ObjectFactoryManager()
 
 OBJECT_FACTORY.register_factory(LayerType.RasterLayer, IRasterLayer)
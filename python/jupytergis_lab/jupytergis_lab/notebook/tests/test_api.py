@@ -1,4 +1,9 @@
+import hashlib
+import json
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 from jupytergis_lab import GISDocument
 
@@ -46,3 +51,204 @@ class TiffLayerTests(unittest.TestCase):
             color_expr=color,
         )
         assert self.doc.layers[tif_layer]["parameters"]["color"] == color
+
+
+class LayerParametersTests(unittest.TestCase):
+    def setUp(self):
+        self.doc = GISDocument()
+
+    def test_opacity(self):
+        with self.assertRaises(ValueError):
+            self.doc.add_raster_layer(
+                "https://tile.openstreetmap.org/{z}/{x}/{y}.png", opacity=1.5
+            )
+
+        with self.assertRaises(ValueError):
+            self.doc.add_geojson_layer(
+                data={"type": "FeatureCollection", "features": []}, opacity=-1
+            )
+
+        # The opacity is checked before the source is created
+        assert len(self.doc._sources) == 0
+        assert len(self.doc.layers) == 0
+
+    def test_zoom_range(self):
+        with self.assertRaises(ValueError):
+            self.doc.add_vectortile_layer(
+                "https://planetarycomputer.microsoft.com/api/data/v1/vector/collections/ms-buildings/tilesets/global-footprints/tiles/{z}/{x}/{y}",
+                min_zoom=10,
+                max_zoom=5,
+            )
+
+        assert len(self.doc._sources) == 0
+
+
+class SourceTests(unittest.TestCase):
+    def setUp(self):
+        self.doc = GISDocument()
+
+    def test_shared_source(self):
+        url = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+        first = self.doc.add_raster_layer(url, name="First")
+        second = self.doc.add_raster_layer(url, name="Second")
+        other = self.doc.add_raster_layer(url, name="Other", attribution="OSM")
+
+        source = self.doc.layers[first]["parameters"]["source"]
+        assert self.doc.layers[second]["parameters"]["source"] == source
+        assert self.doc.layers[other]["parameters"]["source"] != source
+
+    def test_embedded_data_not_shared(self):
+        data = {"type": "FeatureCollection", "features": []}
+
+        # Embedded payloads are neither hashed nor compared
+        with mock.patch("hashlib.blake2b", wraps=hashlib.blake2b) as blake2b:
+            first = self.doc.add_geojson_layer(data=data)
+            second = self.doc.add_geojson_layer(data=data)
+
+        blake2b.assert_not_called()
+        assert (
+            self.doc.layers[first]["parameters"]["source"]
+            != self.doc.layers[second]["parameters"]["source"]
+        )
+
+    def test_geojson_path_shared(self):
+        first = self.doc.add_geojson_layer(path="data.geojson", embed=False)
+        second = self.doc.add_geojson_layer(path="data.geojson", embed=False)
+
+        assert (
+            self.doc.layers[first]["parameters"]["source"]
+            == self.doc.layers[second]["parameters"]["source"]
+        )
+
+
+class GeoJSONLayerTests(unittest.TestCase):
+    def setUp(self):
+        self.doc = GISDocument()
+        self.data = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [1.5, 2.5]},
+                    "properties": {"name": "é"},
+                }
+            ],
+        }
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "data.geojson")
+        with open(self.path, "w", encoding="utf-8") as fobj:
+            json.dump(self.data, fobj)
+
+    def _source_parameters(self, layer_id):
+        source_id = self.doc.layers[layer_id]["parameters"]["source"]
+        return self.doc._sources[source_id]["parameters"]
+
+    def test_embed_path(self):
+        layer = self.doc.add_geojson_layer(path=self.path)
+        parameters = self._source_parameters(layer)
+
+        assert parameters["data"] == self.data
+        assert parameters["path"] is None
+
+    def test_embed_path_nan(self):
+        # Files written by some exporters contain NaN, which is not strict JSON
+        with open(self.path, "w", encoding="utf-8") as fobj:
+            fobj.write(
+                '{"type": "FeatureCollection", "features": [{"type": "Feature", '
+                '"geometry": {"type": "Point", "coordinates": [1.5, 2.5]}, '
+                '"properties": {"value": NaN}}]}'
+            )
+
+        layer = self.doc.add_geojson_layer(path=self.path)
+        parameters = self._source_parameters(layer)
+
+        feature = parameters["data"]["features"][0]
+        assert feature["geometry"]["coordinates"] == [1.5, 2.5]
+        # The source model is dumped in JSON mode, which stores NaN as null
+        assert feature["properties"]["value"] is None
+
+    def test_reference_path(self):
+        layer = self.doc.add_geojson_layer(path="data.geojson", embed=False)
+        parameters = self._source_parameters(layer)
+
+        assert parameters["path"] == "data.geojson"
+        assert parameters["data"] is None
+
+    def test_reference_absolute_path(self):
+        with self.assertRaises(ValueError):
+            self.doc.add_geojson_layer(path=self.path, embed=False)
+
+
+class FilterTests(unittest.TestCase):
+    def setUp(self):
+        self.doc = GISDocument()
+        self.layer = self.doc.add_raster_layer(
+            "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+        )
+
+    def _count_layer_updates(self):
+        updates = []
+        subscription = self.doc._layers.observe(updates.append)
+        self.addCleanup(self.doc._layers.unobserve, subscription)
+        return updates
+
+    def test_add_filter_without_filters(self):
+        assert "filters" not in self.doc.layers[self.layer]
+
+        self.doc.add_filter(self.layer, "all", "height", ">", 10)
+
+        assert self.doc.layers[self.layer]["filters"] == {
+            "appliedFilters": [{"feature": "height", "operator": ">", "value": 10}],
+            "logicalOp": "all",
+        }
+
+    def test_add_filter_null_filters(self):
+        layer = self.doc.layers[self.layer]
+        layer["filters"] = None
+        self.doc._layers[self.layer] = layer
+
+        self.doc.add_filter(self.layer, "all", "height", ">", 10)
+
+        filters = self.doc.layers[self.layer]["filters"]
+        assert filters["appliedFilters"] == [
+            {"feature": "height", "operator": ">", "value": 10}
+        ]
+
+    def test_update_and_clear_filters(self):
+        self.doc.add_filter(self.layer, "all", "height", ">", 10)
+        self.doc.add_filter(self.layer, "all", "type", "==", "house")
+
+        self.doc.update_filter(self.layer, "any", "height", ">", 20)
+        filters = self.doc.layers[self.layer]["filters"]
+        assert filters["logicalOp"] == "any"
+        assert filters["appliedFilters"] == [
+            {"feature": "height", "operator": ">", "value": 20},
+            {"feature": "type", "operator": "==", "value": "house"},
+        ]
+
+        with self.assertRaisesRegex(ValueError, "No feature found with ID: width"):
+            self.doc.update_filter(self.layer, "any", "width", ">", 20)
+
+        self.doc.clear_filters(self.layer)
+        assert self.doc.layers[self.layer]["filters"]["appliedFilters"] == []
+
+    def test_missing_filters(self):
+        with self.assertRaises(ValueError):
+            self.doc.update_filter(self.layer, "all", "height", ">", 10)
+
+        with self.assertRaises(ValueError):
+            self.doc.clear_filters(self.layer)
+
+    def test_noop_updates(self):
+        self.doc.add_filter(self.layer, "all", "height", ">", 10)
+        updates = self._count_layer_updates()
+
+        self.doc.update_filter(self.layer, "all", "height", ">", 10)
+        assert len(updates) == 0
+
+        self.doc.clear_filters(self.layer)
+        assert len(updates) == 1
+
+        self.doc.clear_filters(self.layer)
+        assert len(updates) == 1
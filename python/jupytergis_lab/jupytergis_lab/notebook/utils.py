@@ -1,5 +1,6 @@
 import os
 from enum import Enum
+from functools import lru_cache
 from urllib.parse import urljoin
 import requests
 import mapbox_vector_tile
@@ -26,6 +27,7 @@ def normalize_path(path: str) -> str:
         return os.path.abspath(os.path.join(os.getcwd(), path))
 
 
+@lru_cache(maxsize=128)
 def get_source_layer_names(tile_url):
     # Fetch a sample tile (e.g., z=0, x=0, y=0)
     sample_tile_url = tile_url.format(z=0, x=0, y=0)
@@ -35,7 +37,8 @@ def get_source_layer_names(tile_url):
     tile_data = response.content
     tile = mapbox_vector_tile.decode(tile_data)
 
-    layer_names = list(tile.keys())
+    # Results are cached, return an immutable sequence
+    layer_names = tuple(tile.keys())
 
     if len(layer_names) != 0:
         return layer_names